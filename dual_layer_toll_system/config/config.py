@@ -1,5 +1,22 @@
 # Config file 
 # Configuration file for Dual-Layer Smart Toll System
+import time
+from enum import IntEnum
+
+import numpy as np
+
+from config.database_config import DatabaseConfig
+
+class VehicleType(IntEnum):
+    CAR = 0
+    TRUCK = 1
+    BUS = 2
+    BIKE = 3
+    HEAVY_VEHICLE = 4
+    EMERGENCY = 5
+
+# Toll per vehicle type, indexed by VehicleType
+TOLL_RATES_ARR = np.array([50, 100, 75, 25, 150, 0], dtype=np.int32)
 
 class Config:
     # License Plate Recognition Settings
@@ -15,10 +32,27 @@ class Config:
     MAR_THRESHOLD = 0.7
     CONSECUTIVE_FRAMES_THRESHOLD = 20
     YAWN_FRAMES_THRESHOLD = 15
+    DETECT_SCALE = 0.5  # Face detection runs on the frame resized by this factor
+    DETECT_STRIDE = 5  # Run face detection every N frames, reusing boxes in between
+    DLIB_UPSAMPLE = 0  # dlib HOG upsampling passes; each one roughly quadruples detection cost
+    DLIB_ADJUST_THRESHOLD = 0.0  # Negative values let dlib report weaker face candidates
+    HAAR_SCALE_FACTOR = 1.1
+    HAAR_MIN_NEIGHBORS = 4
+    USE_OPENCL = True  # Run Haar detection through OpenCV's OpenCL path when a device is present
     
     # Facial landmark detection
     SHAPE_PREDICTOR_PATH = "models/shape_predictor_68_face_landmarks.dat"
     
+    # DNN face detector (res10 SSD)
+    FACE_DNN_PROTOTXT = "models/deploy.prototxt"
+    FACE_DNN_MODEL = "models/res10_300x300_ssd_iter_140000.caffemodel"
+    FACE_DNN_CONFIDENCE = 0.5
+    
+    # YuNet face detector (primary for drowsiness detection when the model is present)
+    FACE_YUNET_MODEL = "models/face_detection_yunet_2023mar.onnx"
+    FACE_YUNET_SCORE = 0.9
+    FACE_YUNET_NMS = 0.3
+    
     # Eye landmark indices
     LEFT_EYE_START = 36
     LEFT_EYE_END = 41
@@ -38,19 +72,54 @@ class Config:
     FRAME_WIDTH = 640
     FRAME_HEIGHT = 480
     FPS = 30
+    DISPLAY_FPS = 15  # Live feed window refresh rate; processing still runs at camera rate
+    CAPTURE_YUV = False  # Capture raw YUV and feed the Y plane to drowsiness detection (falls back to BGR)
+    DRAW_OVERLAY = True  # Annotate frames; disable for headless/batch processing
+    
+    # Plate search is skipped on frames with too few (empty scene) or too many (noise) edge pixels
+    PLATE_MIN_EDGE_PIXELS = 100  # Half the outline of the smallest accepted plate (80x20 px)
+    EDGE_DENSITY_MAX = 0.5
+    PLATE_CONTOURS_EXTERNAL_ONLY = False  # Opt-in RETR_EXTERNAL; drops plates nested inside other contours
     
     # File paths
     OUTPUT_DIR = "output/"
     LOG_DIR = "logs/"
     
     # Database settings
-    AUTHORIZED_PLATES_DB = "data/authorized_plates.txt"
+    AUTHORIZED_PLATES_DB = "data/authorized_plates.txt"  # Legacy list, imported into DatabaseConfig.PLATES_DB_PATH
     VIOLATION_LOG = "logs/violations.log"
     
-    # Toll rates
-    TOLL_RATES = {
-        "CAR": 50,
-        "TRUCK": 100,
-        "BUS": 75,
-        "BIKE": 25
-    }
+    # Authorized plates loaded from the plates database, reloaded when its version changes
+    AUTHORIZED_PLATES = None
+    AUTHORIZED_PLATES_VERSION = None
+    AUTHORIZED_PLATES_CHECKED = 0.0
+    AUTHORIZED_PLATES_CHECK_INTERVAL = 1.0  # Seconds between version checks of the plates database
+    
+    # Toll rates (name -> amount view of TOLL_RATES_ARR)
+    TOLL_RATES = {vehicle_type.name: int(TOLL_RATES_ARR[vehicle_type]) for vehicle_type in VehicleType}
+    
+    @staticmethod
+    def get_toll_amount(vehicle_type):
+        """Toll for a VehicleType via array indexing"""
+        return int(TOLL_RATES_ARR[vehicle_type])
+    
+    @classmethod
+    def load_authorized_plates(cls):
+        """Return the authorized plates as an upper-cased frozenset, re-reading the database only when it changes"""
+        # Between checks the cached set is returned without touching the database
+        now = time.monotonic()
+        if cls.AUTHORIZED_PLATES is not None and now - cls.AUTHORIZED_PLATES_CHECKED < cls.AUTHORIZED_PLATES_CHECK_INTERVAL:
+            return cls.AUTHORIZED_PLATES
+        cls.AUTHORIZED_PLATES_CHECKED = now
+        
+        version = DatabaseConfig.authorized_plates_version()
+        if cls.AUTHORIZED_PLATES is None or version != cls.AUTHORIZED_PLATES_VERSION:
+            cls.AUTHORIZED_PLATES = DatabaseConfig.load_authorized_plates()
+            cls.AUTHORIZED_PLATES_VERSION = version
+        return cls.AUTHORIZED_PLATES
+    
+    @classmethod
+    def invalidate_authorized_plates(cls):
+        """Force the next lookup to re-read the plates database"""
+        cls.AUTHORIZED_PLATES = None
+        cls.AUTHORIZED_PLATES_VERSION = None
@@ -1,4 +1,8 @@
 import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 class DatabaseConfig:
@@ -9,7 +13,7 @@ class DatabaseConfig:
     # SQLite database
     PLATES_DB_PATH = DATA_DIR / "plates.db"
     
-    # Text-based databases (fallback)
+    # Text-based databases (fallback); a plain plate list here seeds an empty plates.db
     AUTHORIZED_PLATES_FILE = DATA_DIR / "authorized_plates.txt"
     VEHICLES_DATABASE_FILE = DATA_DIR / "vehicles_database.json"
     TOLL_RATES_FILE = DATA_DIR / "toll_rates.json"
@@ -27,6 +31,25 @@ class DatabaseConfig:
     # Database connection settings
     DB_CONNECTION_TIMEOUT = 30
     DB_MAX_RETRIES = 3
+    DB_POOL_SIZE = 2  # Maximum read-only connections, opened on demand
+    
+    # Applied to every SQLite connection; the writer also sets the journal mode
+    SQLITE_READ_PRAGMAS = """
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-20000;
+    """
+    SQLITE_PRAGMAS = """
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+    """ + SQLITE_READ_PRAGMAS
+    
+    # Connection pool: one serialized writer and a queue of read-only connections
+    _write_conn = None
+    _write_lock = threading.Lock()
+    _read_pool = None
+    _read_opened = 0
+    # Bumped on every write through this process, which PRAGMA data_version does not report
+    _plates_version = 0
     
     # Table schemas
     AUTHORIZED_PLATES_SCHEMA = """
@@ -68,3 +91,110 @@ class DatabaseConfig:
             session_id TEXT
         )
     """
+    
+    @classmethod
+    def init_pool(cls):
+        """Open the writer; read-only connections are opened lazily by get_read_conn"""
+        with cls._write_lock:
+            if cls._read_pool is not None:
+                return
+            
+            # The writer creates the database and tables so readers can open it read-only
+            writer = sqlite3.connect(cls.PLATES_DB_PATH, timeout=cls.DB_CONNECTION_TIMEOUT,
+                                     check_same_thread=False)
+            writer.executescript(cls.SQLITE_PRAGMAS + cls.AUTHORIZED_PLATES_SCHEMA + ";" +
+                                 cls.DETECTION_HISTORY_SCHEMA + ";" + cls.TOLL_TRANSACTIONS_SCHEMA)
+            
+            # First run: import the plain-text plate list so existing deployments keep their plates
+            empty = writer.execute('SELECT 1 FROM authorized_plates LIMIT 1').fetchone() is None
+            if empty and cls.AUTHORIZED_PLATES_FILE.exists():
+                with open(cls.AUTHORIZED_PLATES_FILE, 'r') as f:
+                    writer.executemany('INSERT OR IGNORE INTO authorized_plates(plate_number) VALUES(?)',
+                                       [(line.strip().upper(),) for line in f if line.strip()])
+                writer.commit()
+            
+            cls._write_conn = writer
+            cls._read_pool = queue.Queue()
+    
+    @classmethod
+    @contextmanager
+    def get_read_conn(cls):
+        """Check out a read-only connection and return it to the pool afterwards"""
+        if cls._read_pool is None:
+            cls.init_pool()
+        try:
+            conn = cls._read_pool.get_nowait()
+        except queue.Empty:
+            conn = cls._open_reader()
+        try:
+            yield conn
+        finally:
+            cls._read_pool.put(conn)
+    
+    @classmethod
+    def _open_reader(cls):
+        """Open another read-only connection, or wait for a pooled one once DB_POOL_SIZE are open"""
+        with cls._write_lock:
+            if cls._read_opened >= cls.DB_POOL_SIZE:
+                conn = None
+            else:
+                cls._read_opened += 1
+                # Escaped file: URI so Windows paths and '?', '#', '%' in the path work
+                uri = Path(cls.PLATES_DB_PATH).resolve().as_uri() + "?mode=ro"
+                conn = sqlite3.connect(uri, uri=True, timeout=cls.DB_CONNECTION_TIMEOUT,
+                                       check_same_thread=False)
+                conn.executescript(cls.SQLITE_READ_PRAGMAS)
+        if conn is not None:
+            return conn
+        try:
+            return cls._read_pool.get(timeout=cls.DB_CONNECTION_TIMEOUT)
+        except queue.Empty:
+            raise TimeoutError(f"No read connection to {cls.PLATES_DB_PATH} became free within "
+                               f"{cls.DB_CONNECTION_TIMEOUT}s ({cls.DB_POOL_SIZE} in use)") from None
+    
+    @classmethod
+    @contextmanager
+    def get_write_conn(cls):
+        """Hold the writer connection inside a BEGIN IMMEDIATE transaction"""
+        if cls._read_pool is None:
+            cls.init_pool()
+        with cls._write_lock:
+            conn = cls._write_conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    @classmethod
+    def authorized_plates_version(cls):
+        """Token that changes whenever the authorized_plates table may have changed"""
+        if cls._read_pool is None:
+            cls.init_pool()
+        with cls._write_lock:
+            # data_version moves on commits from other connections and processes
+            data_version = cls._write_conn.execute('PRAGMA data_version').fetchone()[0]
+        return data_version, cls._plates_version
+    
+    @classmethod
+    def load_authorized_plates(cls):
+        """Active authorized plates as an upper-cased frozenset"""
+        with cls.get_read_conn() as conn:
+            rows = conn.execute('SELECT plate_number FROM authorized_plates WHERE is_active = 1').fetchall()
+        return frozenset(row[0] for row in rows)
+    
+    @classmethod
+    def add_authorized_plates(cls, plate_numbers):
+        """Insert (or re-activate) plates in one transaction; returns how many were new or inactive"""
+        with cls.get_write_conn() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT INTO authorized_plates(plate_number) VALUES(?) '
+                'ON CONFLICT(plate_number) DO UPDATE SET is_active = 1 WHERE is_active = 0',
+                [(plate.upper(),) for plate in plate_numbers]
+            )
+            changed = conn.total_changes - before
+        cls._plates_version += 1
+        return changed
@@ -3,8 +3,40 @@ import numpy as np
 import os
 from pathlib import Path
 import json
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from config.config import Config, VehicleType
+from config.database_config import DatabaseConfig
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def write_json(data, path):
+    """Write data as indented JSON, using orjson when it is installed"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
 
 class SampleDataGenerator:
+    # Plate text style
+    PLATE_FONT = cv2.FONT_HERSHEY_SIMPLEX
+    PLATE_FONT_SCALE = 0.8
+    PLATE_THICKNESS = 2
+    
+    # Synthetic test plates don't need CameraConfig.IMAGE_QUALITY (95)
+    PLATE_JPEG_QUALITY = 80
+    
+    # Blank plate with border, shared by every generated image
+    _TEMPLATE = np.full((60, 200, 3), 255, dtype=np.uint8)
+    cv2.rectangle(_TEMPLATE, (2, 2), (197, 57), (0, 0, 0), 2)
+    
     def __init__(self):
         self.data_dir = Path("data")
         self.sample_images_dir = self.data_dir / "sample_images"
@@ -19,10 +51,8 @@ class SampleDataGenerator:
             "HR10TU5319"
         ]
         
-        authorized_file = self.data_dir / "authorized_plates.txt"
-        with open(authorized_file, 'w') as f:
-            for plate in sample_plates:
-                f.write(f"{plate}\n")
+        # Bulk-insert into the plates database in a single transaction
+        DatabaseConfig.add_authorized_plates(sample_plates)
         
         print(f"Created authorized plates database with {len(sample_plates)} entries")
     
@@ -43,51 +73,35 @@ class SampleDataGenerator:
             vehicles_data.append(vehicle_info)
         
         vehicles_file = self.data_dir / "vehicles_database.json"
-        with open(vehicles_file, 'w') as f:
-            json.dump(vehicles_data, f, indent=2)
+        write_json(vehicles_data, vehicles_file)
         
         print(f"Created vehicle database with {len(vehicles_data)} entries")
     
     def create_toll_rates_config(self):
         """Create toll rates configuration"""
-        toll_rates = {
-            "CAR": 50,
-            "TRUCK": 120,
-            "BUS": 80,
-            "BIKE": 20,
-            "HEAVY_VEHICLE": 150,
-            "EMERGENCY": 0
-        }
+        toll_rates = {vehicle_type.name: Config.get_toll_amount(vehicle_type) for vehicle_type in VehicleType}
         
         rates_file = self.data_dir / "toll_rates.json"
-        with open(rates_file, 'w') as f:
-            json.dump(toll_rates, f, indent=2)
+        write_json(toll_rates, rates_file)
         
         print("Created toll rates configuration")
     
     def generate_synthetic_plate_image(self, plate_text, output_path):
         """Generate a synthetic license plate image for testing"""
-        # Create a blank image (license plate dimensions)
-        img = np.ones((60, 200, 3), dtype=np.uint8) * 255
-        
-        # Draw border
-        cv2.rectangle(img, (2, 2), (197, 57), (0, 0, 0), 2)
-        
-        # Add text
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.8
-        thickness = 2
+        # Start from the bordered blank plate
+        img = self._TEMPLATE.copy()
         
         # Calculate text size and position
-        text_size = cv2.getTextSize(plate_text, font, font_scale, thickness)[0]
+        text_size = cv2.getTextSize(plate_text, self.PLATE_FONT, self.PLATE_FONT_SCALE, self.PLATE_THICKNESS)[0]
         text_x = (img.shape[1] - text_size[0]) // 2
         text_y = (img.shape[0] + text_size[1]) // 2
         
         # Draw text
-        cv2.putText(img, plate_text, (text_x, text_y), font, font_scale, (0, 0, 0), thickness)
+        cv2.putText(img, plate_text, (text_x, text_y), self.PLATE_FONT, self.PLATE_FONT_SCALE,
+                    (0, 0, 0), self.PLATE_THICKNESS)
         
         # Save image
-        cv2.imwrite(str(output_path), img)
+        cv2.imwrite(str(output_path), img, [cv2.IMWRITE_JPEG_QUALITY, self.PLATE_JPEG_QUALITY])
         return img
     
     def create_sample_plate_images(self):
@@ -111,11 +125,10 @@ class SampleDataGenerator:
             duration = 1.0
             frequency = 800
             
-            t = np.linspace(0, duration, int(sample_rate * duration))
-            audio_data = np.sin(2 * np.pi * frequency * t) * 0.5
-            
-            # Convert to 16-bit integers
-            audio_data = (audio_data * 32767).astype(np.int16)
+            # Build the phase in float32 and convert straight to 16-bit integers
+            n = int(sample_rate * duration)
+            phase = (2 * np.pi * frequency / sample_rate) * np.arange(n, dtype=np.float32)
+            audio_data = (np.sin(phase, dtype=np.float32) * (0.5 * 32767)).astype(np.int16)
             
             alert_file = self.data_dir / "alert_sound.wav"
             write(str(alert_file), sample_rate, audio_data)
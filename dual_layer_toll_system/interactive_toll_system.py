@@ -9,24 +9,177 @@ from pathlib import Path
 sys.path.append(os.path.dirname(__file__))
 
 from src.integration.toll_system import DualLayerTollSystem
+from src.drowsiness_detection.ear import mean_eye_aspect_ratio
+from config.camera_config import CameraConfig
+from utils.camera_utils import FrameGrabber
+
+# Static overlay elements, drawn once into a HUD layer:
+# ('rect', pt1, pt2, color, thickness) or ('text', text, org, scale, color, thickness)
+FACE_CHECK_HUD = [
+    ('rect', (50, 50), (590, 100), (0, 0, 0), -1),
+    ('text', "Look at camera - Close eyes to test drowsiness", (50, 450), 0.6, (255, 255, 0), 2),
+]
+PLATE_SCAN_HUD = [
+    ('text', "Hold license plate clearly in view", (50, 450), 0.6, (255, 255, 0), 2),
+]
+
+try:
+    import dlib
+except ImportError:
+    dlib = None
 
 class SimpleTollSystem:
     def __init__(self):
         self.system = DualLayerTollSystem()
         self.driver_safe = True
+        self.grabber = None
+        
+        # Load cascades once instead of on every face check
+        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+        
+        # Prefer the DNN face detector and landmark-based EAR; Haar cascades remain the fallback
+        self.face_net = self.load_face_net()
+        self.predictor = self.load_shape_predictor()
+        
+        # Compile the EAR kernel now rather than inside the timed face check
+        mean_eye_aspect_ratio(np.zeros((2, 6, 2), dtype=np.float32))
+        
+        # Detection runs on every SKIP_FRAMES-th frame; the last result is reused in between
+        self._frame_idx = 0
+        self._last_faces = ()
+        
+        # Reusable grayscale buffers for detection
+        self._gray = np.empty((CameraConfig.FRAME_HEIGHT, CameraConfig.FRAME_WIDTH), dtype=np.uint8)
+        self._small = np.empty((CameraConfig.FRAME_HEIGHT // 2, CameraConfig.FRAME_WIDTH // 2), dtype=np.uint8)
+        
+        # Solid result-screen backgrounds
+        self._green_bg = np.full((480, 640, 3), (0, 100, 0), dtype=np.uint8)
+        self._red_bg = np.full((480, 640, 3), (0, 0, 100), dtype=np.uint8)
+        
+        # Pre-rendered static overlays
+        self._face_hud, self._face_hud_mask = self.build_hud(FACE_CHECK_HUD)
+        self._plate_hud, self._plate_hud_mask = self.build_hud(PLATE_SCAN_HUD)
+        
+    def build_hud(self, elements):
+        """Render static overlay elements into an image and a matching mask"""
+        hud = np.zeros((CameraConfig.FRAME_HEIGHT, CameraConfig.FRAME_WIDTH, 3), dtype=np.uint8)
+        mask = np.zeros((CameraConfig.FRAME_HEIGHT, CameraConfig.FRAME_WIDTH), dtype=np.uint8)
+        
+        for kind, *args in elements:
+            if kind == 'rect':
+                pt1, pt2, color, thickness = args
+                cv2.rectangle(hud, pt1, pt2, color, thickness)
+                cv2.rectangle(mask, pt1, pt2, 255, thickness)
+            else:
+                text, org, scale, color, thickness = args
+                cv2.putText(hud, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+                cv2.putText(mask, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, 255, thickness)
+        
+        return hud, mask[:, :, np.newaxis].astype(bool)
+    
+    def apply_hud(self, frame, hud, mask, elements):
+        """Blit a pre-rendered overlay onto frame, redrawing it if the frame size differs"""
+        if frame.shape == hud.shape:
+            np.copyto(frame, hud, where=mask)
+        else:
+            for kind, *args in elements:
+                if kind == 'rect':
+                    cv2.rectangle(frame, *args)
+                else:
+                    text, org, scale, color, thickness = args
+                    cv2.putText(frame, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        
+    def load_face_net(self):
+        """Load the res10 SSD face detector, or None if the model files are missing"""
+        config = self.system.config
+        prototxt = getattr(config, 'FACE_DNN_PROTOTXT', 'models/deploy.prototxt')
+        model = getattr(config, 'FACE_DNN_MODEL', 'models/res10_300x300_ssd_iter_140000.caffemodel')
+        try:
+            cv2.setUseOptimized(True)
+            net = cv2.dnn.readNetFromCaffe(prototxt, model)
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            # FP16 CPU target only exists in newer OpenCV builds
+            net.setPreferableTarget(getattr(cv2.dnn, 'DNN_TARGET_CPU_FP16', cv2.dnn.DNN_TARGET_CPU))
+            print("✓ DNN face detector loaded")
+            return net
+        except Exception:
+            print("Warning: DNN face model not found, using Haar cascades")
+            return None
+    
+    def load_shape_predictor(self):
+        """Load the dlib landmark predictor used for EAR, or None if unavailable"""
+        # Reuse the predictor the drowsiness detector already parsed from disk
+        shared = getattr(self.system.drowsiness_detector, 'predictor', None)
+        if shared is not None:
+            return shared
+        
+        if dlib is None:
+            print("Warning: Dlib not available, using eye cascade for drowsiness check")
+            return None
+        try:
+            path = getattr(self.system.config, 'SHAPE_PREDICTOR_PATH', 'models/shape_predictor_68_face_landmarks.dat')
+            return dlib.shape_predictor(path)
+        except Exception:
+            print("Warning: Could not load facial landmark predictor, using eye cascade")
+            return None
+    
+    def detect_faces(self, frame, gray):
+        """Return face boxes as (x, y, w, h) in full-frame coordinates"""
+        if self.face_net is not None:
+            h, w = frame.shape[:2]
+            blob = cv2.dnn.blobFromImage(frame, 1.0, (300, 300), (104, 177, 123))
+            self.face_net.setInput(blob)
+            detections = self.face_net.forward()
+            
+            min_confidence = getattr(self.system.config, 'FACE_DNN_CONFIDENCE', 0.5)
+            faces = []
+            for i in range(detections.shape[2]):
+                if detections[0, 0, i, 2] < min_confidence:
+                    continue
+                x1, y1, x2, y2 = (detections[0, 0, i, 3:7] * np.array([w, h, w, h])).astype(int)
+                x1, y1 = max(x1, 0), max(y1, 0)
+                x2, y2 = min(x2, w), min(y2, h)
+                if x2 > x1 and y2 > y1:
+                    faces.append((x1, y1, x2 - x1, y2 - y1))
+            return faces
         
+        # Haar fallback on a half-resolution image
+        h, w = gray.shape
+        if self._small.shape != (h // 2, w // 2):
+            self._small = np.empty((h // 2, w // 2), dtype=np.uint8)
+        small = cv2.resize(gray, (w // 2, h // 2), dst=self._small, interpolation=cv2.INTER_AREA)
+        faces = self.face_cascade.detectMultiScale(small, 1.2, 4, minSize=(40, 40))
+        return [tuple(int(v) * 2 for v in face) for face in faces]
+    
+    def eye_aspect_ratio(self, gray, face):
+        """Average eye aspect ratio of both eyes from 68-point landmarks"""
+        config = self.system.config
+        x, y, w, h = face
+        shape = self.predictor(gray, dlib.rectangle(int(x), int(y), int(x + w), int(y + h)))
+        
+        eye_idx = (list(range(getattr(config, 'LEFT_EYE_START', 36), getattr(config, 'LEFT_EYE_END', 41) + 1)) +
+                   list(range(getattr(config, 'RIGHT_EYE_START', 42), getattr(config, 'RIGHT_EYE_END', 47) + 1)))
+        pts = np.array([(shape.part(i).x, shape.part(i).y) for i in eye_idx], dtype=np.float32).reshape(2, 6, 2)
+        return mean_eye_aspect_ratio(pts)
+    
     def run_toll_booth(self, camera_index=0):
         """Run the simplified toll booth system"""
         
         # Test camera first
         print("🔍 Testing camera connection...")
-        cap = cv2.VideoCapture(camera_index)
+        # Pick V4L2 directly on Linux instead of letting OpenCV probe backends
+        backend = cv2.CAP_V4L2 if sys.platform.startswith('linux') else cv2.CAP_ANY
+        cap = cv2.VideoCapture(camera_index, backend)
         if not cap.isOpened():
             print("❌ Error: Could not open camera. Please check camera connection.")
             return
         
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        # Request MJPG before the frame size so the driver negotiates the format once
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, CameraConfig.FRAME_WIDTH)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CameraConfig.FRAME_HEIGHT)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         
         print("\n" + "="*60)
         print("🚗 SMART TOLL BOOTH SYSTEM 🚗")
@@ -38,17 +191,23 @@ class SimpleTollSystem:
         print("\nPress 'q' to quit anytime")
         print("="*60 + "\n")
         
+        # Capture runs on its own thread so detection never waits on cap.read()
+        grabber = FrameGrabber(cap).start()
+        self.grabber = grabber
+        
         try:
             # STEP 1: Face Detection
-            self.step1_face_check(cap)
+            self.step1_face_check(grabber)
             
             if self.driver_safe:
                 # STEP 2: License Plate Detection
-                self.step2_plate_scan(cap)
+                self.step2_plate_scan(grabber)
             
         except KeyboardInterrupt:
             print("\n👋 System stopped by user")
         finally:
+            grabber.stop()
+            self.grabber = None
             cap.release()
             cv2.destroyAllWindows()
     
@@ -58,14 +217,17 @@ class SimpleTollSystem:
         print("Look at the camera. Close your eyes to test drowsiness detection.")
         print("Analysis will run for 3 seconds...\n")
         
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-        
         start_time = time.time()
         analysis_duration = 3.0
         eye_closure_count = 0
         frame_count = 0
         
+        ear_threshold = getattr(self.system.config, 'EAR_THRESHOLD', 0.25)
+        consecutive_threshold = getattr(self.system.config, 'CONSECUTIVE_FRAMES_THRESHOLD', 20)
+        consecutive_closed = 0
+        max_consecutive_closed = 0
+        elapsed = 0.0
+        
         while True:
             ret, frame = cap.read()
             if not ret:
@@ -75,13 +237,22 @@ class SimpleTollSystem:
             frame_count += 1
             elapsed = time.time() - start_time
             
-            # Convert to grayscale for detection
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+            # Convert to grayscale for detection, reusing the same buffer every frame
+            if self._gray.shape != frame.shape[:2]:
+                self._gray = np.empty(frame.shape[:2], dtype=np.uint8)
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+            
+            # Detect faces every SKIP_FRAMES frames
+            if self._frame_idx % CameraConfig.SKIP_FRAMES == 0:
+                self._last_faces = self.detect_faces(frame, gray)
+            self._frame_idx += 1
+            faces = self._last_faces
+            
+            # Static overlay (progress background, instructions)
+            self.apply_hud(frame, self._face_hud, self._face_hud_mask, FACE_CHECK_HUD)
             
             # Draw progress
             progress = min(elapsed / analysis_duration, 1.0)
-            cv2.rectangle(frame, (50, 50), (590, 100), (0, 0, 0), -1)
             cv2.rectangle(frame, (60, 60), (60 + int(520 * progress), 80), (0, 255, 0), -1)
             cv2.putText(frame, f"Face Analysis: {elapsed:.1f}s / {analysis_duration}s", 
                        (60, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
@@ -92,24 +263,41 @@ class SimpleTollSystem:
                 x, y, w, h = face
                 cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
                 
-                # Eye detection
-                face_roi_gray = gray[y:y+h, x:x+w]
-                face_roi_color = frame[y:y+h, x:x+w]
-                eyes = eye_cascade.detectMultiScale(face_roi_gray, 1.1, 3)
+                if self.predictor is not None:
+                    # Landmark-based eye aspect ratio
+                    ear = self.eye_aspect_ratio(gray, face)
+                    eyes_closed = ear < ear_threshold
+                    if eyes_closed:
+                        cv2.putText(frame, f"😴 Eyes: CLOSED (EAR {ear:.2f})", (x, y-10), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                    else:
+                        cv2.putText(frame, f"👀 Eyes: OPEN (EAR {ear:.2f})", (x, y-10), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                else:
+                    # Eye detection
+                    face_roi_gray = gray[y:y+h, x:x+w]
+                    face_roi_color = frame[y:y+h, x:x+w]
+                    eyes = self.eye_cascade.detectMultiScale(face_roi_gray, 1.1, 3)
+                    eyes_closed = len(eyes) < 2
+                    
+                    if len(eyes) >= 2:
+                        cv2.putText(frame, "👀 Eyes: OPEN", (x, y-10), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                        for (ex, ey, ew, eh) in eyes:
+                            cv2.rectangle(face_roi_color, (ex, ey), (ex+ew, ey+eh), (0, 255, 0), 2)
+                    elif len(eyes) == 1:
+                        cv2.putText(frame, "😑 Eyes: PARTIAL", (x, y-10), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+                    else:
+                        cv2.putText(frame, "😴 Eyes: CLOSED", (x, y-10), 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
                 
-                if len(eyes) >= 2:
-                    cv2.putText(frame, "👀 Eyes: OPEN", (x, y-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                    for (ex, ey, ew, eh) in eyes:
-                        cv2.rectangle(face_roi_color, (ex, ey), (ex+ew, ey+eh), (0, 255, 0), 2)
-                elif len(eyes) == 1:
-                    cv2.putText(frame, "😑 Eyes: PARTIAL", (x, y-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+                if eyes_closed:
                     eye_closure_count += 1
+                    consecutive_closed += 1
+                    max_consecutive_closed = max(max_consecutive_closed, consecutive_closed)
                 else:
-                    cv2.putText(frame, "😴 Eyes: CLOSED", (x, y-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                    eye_closure_count += 1
+                    consecutive_closed = 0
                 
                 cv2.putText(frame, "Face Detected", (x, y+h+20), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
@@ -117,10 +305,6 @@ class SimpleTollSystem:
                 cv2.putText(frame, "❌ No Face Detected", (50, 150), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
             
-            # Instructions
-            cv2.putText(frame, "Look at camera - Close eyes to test drowsiness", 
-                       (50, 450), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-            
             # Show frame
             cv2.imshow('🚗 Toll System - Face Check', frame)
             
@@ -141,8 +325,10 @@ class SimpleTollSystem:
         print(f"\n📊 FACE ANALYSIS RESULTS:")
         print(f"Duration: {elapsed:.1f} seconds")
         print(f"Eye closure ratio: {drowsiness_ratio:.2f}")
+        print(f"Longest eye closure: {max_consecutive_closed} frames")
         
-        if drowsiness_ratio > 0.3:  # 30% of frames with closed/partial eyes
+        # 30% of frames with closed/partial eyes, or a sustained closure
+        if drowsiness_ratio > 0.3 or max_consecutive_closed >= consecutive_threshold:
             print("😴 RESULT: DRIVER APPEARS DROWSY")
             print("⚠️  SAFETY VIOLATION - Access will be denied")
             self.driver_safe = False
@@ -172,13 +358,13 @@ class SimpleTollSystem:
                 break
             
             # Detect license plate
-            plates, processed_frame = self.system.plate_recognizer.detect_and_recognize(frame)
+            # The frame is ours, so annotations go straight onto it
+            plates, processed_frame = self.system.plate_recognizer.detect_and_recognize(frame, in_place=True)
             
             # Draw instructions
+            self.apply_hud(processed_frame, self._plate_hud, self._plate_hud_mask, PLATE_SCAN_HUD)
             cv2.putText(processed_frame, f"License Plate Detection: {detection_count}/{required_detections}", 
                        (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-            cv2.putText(processed_frame, "Hold license plate clearly in view", 
-                       (50, 450), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
             
             if plates:
                 plate = plates[0]
@@ -239,39 +425,40 @@ class SimpleTollSystem:
             print(f"😴 Driver unsafe to proceed")
             self.show_violation_screen("UNSAFE DRIVER")
     
-    def show_success_screen(self, plate_text):
-        """Show success screen"""
-        img = np.zeros((480, 640, 3), dtype=np.uint8)
-        img[:] = (0, 100, 0)  # Green background
-        
-        cv2.putText(img, "ACCESS GRANTED", (150, 150), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
-        cv2.putText(img, f"Plate: {plate_text}", (200, 220), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        cv2.putText(img, "Toll: Rs. 50", (250, 280), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        cv2.putText(img, "Have a safe journey!", (180, 350), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    def show_result_screen(self, background, lines):
+        """Draw (text, org, scale, thickness) lines on a copy of a cached background and show it"""
+        img = background.copy()
+        
+        for text, org, scale, thickness in lines:
+            cv2.putText(img, text, org, cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), thickness)
         
         cv2.imshow('🚗 Toll System - Result', img)
-        cv2.waitKey(3000)  # Show for 3 seconds
+        
+        # Show for 3 seconds, polling keys and dropping camera frames meanwhile
+        deadline = time.monotonic() + 3
+        while time.monotonic() < deadline:
+            if cv2.waitKey(30) & 0xFF == ord('q'):
+                break
+            if self.grabber is not None:
+                self.grabber.drain()
         cv2.destroyAllWindows()
     
+    def show_success_screen(self, plate_text):
+        """Show success screen"""
+        self.show_result_screen(self._green_bg, [
+            ("ACCESS GRANTED", (150, 150), 1.5, 3),
+            (f"Plate: {plate_text}", (200, 220), 1, 2),
+            ("Toll: Rs. 50", (250, 280), 1, 2),
+            ("Have a safe journey!", (180, 350), 0.8, 2),
+        ])
+    
     def show_violation_screen(self, message):
         """Show violation screen"""
-        img = np.zeros((480, 640, 3), dtype=np.uint8)
-        img[:] = (0, 0, 100)  # Red background
-        
-        cv2.putText(img, "ACCESS DENIED", (150, 150), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
-        cv2.putText(img, message, (50, 250), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        cv2.putText(img, "Contact Administration", (150, 350), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        
-        cv2.imshow('🚗 Toll System - Result', img)
-        cv2.waitKey(3000)  # Show for 3 seconds
-        cv2.destroyAllWindows()
+        self.show_result_screen(self._red_bg, [
+            ("ACCESS DENIED", (150, 150), 1.5, 3),
+            (message, (50, 250), 0.8, 2),
+            ("Contact Administration", (150, 350), 0.8, 2),
+        ])
 
 def main():
     try:
@@ -2,21 +2,31 @@
 import sys
 import os
 import argparse
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import cv2
 import numpy as np
 
 sys.path.append(os.path.dirname(__file__))
 
+_SYSTEM = None
+
+def get_system():
+    """Create the toll system on first use and reuse it afterwards"""
+    global _SYSTEM
+    if _SYSTEM is None:
+        from src.integration.toll_system import DualLayerTollSystem
+        _SYSTEM = DualLayerTollSystem()
+    return _SYSTEM
+
 def test_imports():
     """Test if all imports work correctly"""
     print("Testing imports...")
     
     try:
-        from src.integration.toll_system import DualLayerTollSystem
-        print("✓ DualLayerTollSystem imported successfully")
-        
-        system = DualLayerTollSystem()
+        get_system()
         print("✓ DualLayerTollSystem instance created successfully")
         return True
         
@@ -24,28 +34,15 @@ def test_imports():
         print(f"✗ Import error: {e}")
         return False
 
-class ImageWithFilename:
-    """Wrapper to attach filename to image"""
-    def __init__(self, image, filename):
-        self._image = image
-        self.filename = filename
-        self.shape = image.shape
-        self.dtype = image.dtype
+class ImageWithFilename(np.ndarray):
+    """ndarray view of an image with its filename attached"""
+    def __new__(cls, image, filename):
+        obj = np.asarray(image).view(cls)
+        obj.filename = filename
+        return obj
     
-    def copy(self):
-        return ImageWithFilename(self._image.copy(), self.filename)
-    
-    def __array__(self):
-        return self._image
-    
-    def __getattr__(self, name):
-        return getattr(self._image, name)
-    
-    def __getitem__(self, key):
-        return self._image[key]
-    
-    def __setitem__(self, key, value):
-        self._image[key] = value
+    def __array_finalize__(self, obj):
+        self.filename = getattr(obj, 'filename', None)
 
 def main():
     parser = argparse.ArgumentParser(description='Dual-Layer Smart Toll System')
@@ -57,49 +54,63 @@ def main():
     if not test_imports():
         return
     
-    from src.integration.toll_system import DualLayerTollSystem
     try:
-        from utils.image_utils import resize_image
+        from utils.image_utils import read_image
     except:
-        def resize_image(img):
-            return img
+        def read_image(path):
+            return cv2.imread(str(path))
     
     try:
-        system = DualLayerTollSystem()
+        system = get_system()
         
         if args.test_images:
             sample_dir = Path("data/sample_images")
-            image_files = list(sample_dir.glob("*.jpg")) + list(sample_dir.glob("*.png"))
+            # Single directory scan, filtering by extension
+            image_exts = {'.jpg', '.jpeg', '.png'}
+            image_files = [Path(entry.path) for entry in os.scandir(sample_dir)
+                           if entry.is_file() and Path(entry.name).suffix.lower() in image_exts]
             
             print(f"Found {len(image_files)} sample images")
             
-            for img_file in image_files:
-                print(f"Processing {img_file.name}...")
-                img = cv2.imread(str(img_file))
-                if img is not None:
-                    # Resize image
-                    img = resize_image(img)
-                    
-                    # Create wrapper with filename
-                    img_wrapper = ImageWithFilename(img, str(img_file))
-                    
-                    # Process frame
-                    results = system.process_frame(img_wrapper)
-                    
-                    # Show result
-                    cv2.imshow(f'Result - {img_file.name}', results['processed_frame'])
-                    print(f"Decision: {results['system_decision']}")
-                    if results['license_plates']:
-                        for plate in results['license_plates']:
-                            print(f"  Plate: {plate['text']} (confidence: {plate['confidence']:.2f})")
-                    
-                    # Wait for key press or auto-continue after 3 seconds
-                    key = cv2.waitKey(3000) & 0xFF
-                    if key == ord('q'):
-                        break
-                else:
-                    print(f"Could not load {img_file.name}")
-                    
+            # Decode (at reduced resolution where possible) and resize images on worker threads while earlier ones
+            # are processed, keeping at most lookahead decoded images in flight
+            lookahead = 4
+            with ThreadPoolExecutor(max_workers=lookahead) as loader:
+                pending = deque()
+                files = iter(image_files)
+                for img_file in itertools.islice(files, lookahead):
+                    pending.append((img_file, loader.submit(read_image, img_file)))
+                while pending:
+                    img_file, future = pending.popleft()
+                    img = future.result()
+                    for next_file in itertools.islice(files, 1):
+                        pending.append((next_file, loader.submit(read_image, next_file)))
+                    print(f"Processing {img_file.name}...")
+                    if img is not None:
+                        # Create wrapper with filename
+                        img_wrapper = ImageWithFilename(img, str(img_file))
+                        
+                        # Process frame
+                        results = system.process_frame(img_wrapper)
+                        
+                        # Show result
+                        cv2.imshow(f'Result - {img_file.name}', results['processed_frame'])
+                        print(f"Decision: {results['system_decision']}")
+                        if results['license_plates']:
+                            for plate in results['license_plates']:
+                                print(f"  Plate: {plate['text']} (confidence: {plate['confidence']:.2f})")
+                        
+                        # Wait for key press or auto-continue after 3 seconds
+                        key = cv2.waitKey(3000) & 0xFF
+                        if key == ord('q'):
+                            break
+                    else:
+                        print(f"Could not load {img_file.name}")
+                
+                # Drop decodes that have not started if the loop was quit early
+                for _, future in pending:
+                    future.cancel()
+            
             cv2.destroyAllWindows()
         else:
             system.run_camera_feed(args.camera)
@@ -4,6 +4,10 @@ import bz2
 import gzip
 from pathlib import Path
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK_SIZE = 1 << 16
+DOWNLOAD_WORKERS = 4
 
 class ModelDownloader:
     def __init__(self):
@@ -17,6 +21,21 @@ class ModelDownloader:
                 'compression': 'bz2',
                 'size_mb': 99.7
             },
+            'deploy.prototxt': {
+                'url': 'https://raw.githubusercontent.com/opencv/opencv/master/samples/dnn/face_detector/deploy.prototxt',
+                'compressed': False,
+                'size_mb': 0.03
+            },
+            'res10_300x300_ssd_iter_140000.caffemodel': {
+                'url': 'https://raw.githubusercontent.com/opencv/opencv_3rdparty/dnn_samples_face_detector_20170830/res10_300x300_ssd_iter_140000.caffemodel',
+                'compressed': False,
+                'size_mb': 10.2
+            },
+            'face_detection_yunet_2023mar.onnx': {
+                'url': 'https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx',
+                'compressed': False,
+                'size_mb': 0.2
+            },
             'haarcascade_frontalface_default.xml': {
                 'url': 'https://raw.githubusercontent.com/opencv/opencv/master/data/haarcascades/haarcascade_frontalface_default.xml',
                 'compressed': False,
@@ -24,6 +43,77 @@ class ModelDownloader:
             }
         }
     
+    def copy_stream(self, f_in, f_out):
+        """Copy f_in to f_out in fixed-size chunks"""
+        while True:
+            chunk = f_in.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            f_out.write(chunk)
+    
+    def get_content_length(self, url):
+        """Return (final_url, size) from a HEAD request, or (url, None) if the size is unknown"""
+        try:
+            request = urllib.request.Request(url, method='HEAD')
+            with urllib.request.urlopen(request) as response:
+                return response.geturl(), int(response.headers.get('Content-Length', 0)) or None
+        except Exception:
+            return url, None
+    
+    def fetch_range(self, url, dest, start, end):
+        """Write bytes start..end of url into dest at the same offset; False if ranges are unsupported"""
+        request = urllib.request.Request(url, headers={'Range': f'bytes={start}-{end}'})
+        with urllib.request.urlopen(request) as response:
+            if response.status != 206:
+                return False
+            with open(dest, 'r+b') as f_out:
+                f_out.seek(start)
+                written = 0
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f_out.write(chunk)
+                    written += len(chunk)
+        return written == end - start + 1
+    
+    def fetch(self, url, dest):
+        """Download url to dest, splitting it into parallel range requests when possible
+        
+        Data goes to a sibling .part file that only replaces dest once the whole download succeeded,
+        so a failed download never leaves a file that looks complete.
+        """
+        dest = Path(dest)
+        part = dest.with_suffix(dest.suffix + '.part')
+        try:
+            self.fetch_into(url, part)
+            os.replace(part, dest)
+        except BaseException:
+            if part.exists():
+                part.unlink()
+            raise
+    
+    def fetch_into(self, url, dest):
+        """Write url to dest directly, using parallel range requests when the server supports them"""
+        url, size = self.get_content_length(url)
+        
+        if size and size >= DOWNLOAD_WORKERS * CHUNK_SIZE:
+            step = -(-size // DOWNLOAD_WORKERS)
+            ranges = [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+            
+            # Pre-size the file so each worker can write its own slice
+            with open(dest, 'wb') as f_out:
+                f_out.truncate(size)
+            
+            with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+                results = list(pool.map(lambda r: self.fetch_range(url, dest, *r), ranges))
+            if all(results):
+                return
+            print("Server does not support range requests, downloading sequentially")
+        
+        with urllib.request.urlopen(url) as response, open(dest, 'wb') as f_out:
+            self.copy_stream(response, f_out)
+    
     def download_model(self, model_name):
         if model_name not in self.model_urls:
             print(f"Unknown model: {model_name}")
@@ -41,21 +131,21 @@ class ModelDownloader:
             
             if model_info['compressed']:
                 compressed_path = model_path.with_suffix(model_path.suffix + f".{model_info['compression']}")
-                urllib.request.urlretrieve(model_info['url'], compressed_path)
+                self.fetch(model_info['url'], compressed_path)
                 
-                # Decompress
-                if model_info['compression'] == 'bz2':
-                    with bz2.BZ2File(compressed_path, 'rb') as f_in:
-                        with open(model_path, 'wb') as f_out:
-                            f_out.write(f_in.read())
-                elif model_info['compression'] == 'gz':
-                    with gzip.open(compressed_path, 'rb') as f_in:
-                        with open(model_path, 'wb') as f_out:
-                            f_out.write(f_in.read())
+                # Decompress in chunks instead of loading the whole model into memory
+                opener = bz2.open if model_info['compression'] == 'bz2' else gzip.open
+                try:
+                    with opener(compressed_path, 'rb') as f_in, open(model_path, 'wb') as f_out:
+                        self.copy_stream(f_in, f_out)
+                except Exception:
+                    if model_path.exists():
+                        model_path.unlink()
+                    raise
                 
                 compressed_path.unlink()  # Remove compressed file
             else:
-                urllib.request.urlretrieve(model_info['url'], model_path)
+                self.fetch(model_info['url'], model_path)
                 
             print(f"Successfully downloaded {model_name}")
             return True
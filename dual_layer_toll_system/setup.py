@@ -15,5 +15,9 @@ setup(
         "pygame==2.5.2",
         "Pillow==10.0.0"
     ],
+    extras_require={
+        "fast": ["orjson>=3.9"],
+        "numba": ["numba>=0.57"],
+    },
     python_requires=">=3.8",
 )
@@ -2,8 +2,11 @@
 import cv2
 import numpy as np
 import logging
+import os
 import time
 
+from src.drowsiness_detection.ear import mean_eye_aspect_ratio
+
 class DrowsinessDetector:
     def __init__(self, config):
         self.config = config
@@ -12,6 +15,10 @@ class DrowsinessDetector:
         try:
             import dlib
             self.detector = dlib.get_frontal_face_detector()
+            self._face_rect = dlib.rectangle
+            # HOG detection is far slower without SIMD; report what this build was compiled with
+            print(f"✓ Dlib {dlib.__version__} (CUDA: {getattr(dlib, 'DLIB_USE_CUDA', False)}, "
+                  f"AVX: {getattr(dlib, 'USE_AVX_INSTRUCTIONS', 'unknown')})")
             shape_predictor_path = getattr(config, 'SHAPE_PREDICTOR_PATH', 'models/shape_predictor_68_face_landmarks.dat')
             try:
                 self.predictor = dlib.shape_predictor(shape_predictor_path)
@@ -20,14 +27,59 @@ class DrowsinessDetector:
                 print("Warning: Could not load facial landmark predictor, using basic detection")
                 self.predictor = None
         except ImportError:
-            print("Warning: Dlib not available, using OpenCV for face detection")
+            print("Warning: Dlib not available, using OpenCV Haar cascade for face detection")
+            print("  Install an AVX-enabled build for faster detection: pip install dlib-bin")
             self.detector = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
             self.predictor = None
         
+        # Haar parameters are fixed for the lifetime of the detector
+        self.haar_scale_factor = getattr(config, 'HAAR_SCALE_FACTOR', 1.1)
+        self.haar_min_neighbors = getattr(config, 'HAAR_MIN_NEIGHBORS', 4)
+        
+        # Haar detection on a UMat is dispatched to OpenCL when a device is available
+        self.use_opencl = getattr(config, 'USE_OPENCL', True) and cv2.ocl.haveOpenCL()
+        
+        # YuNet CNN detector is preferred when OpenCV and the model support it
+        self._yunet = self.load_yunet()
+        
+        # Detector chosen once; every variant returns (x, y, w, h) boxes in detection-image coordinates
+        if self._yunet is not None:
+            self._detect_fn = self._detect_yunet
+        elif hasattr(self.detector, 'detectMultiScale'):
+            self._detect_fn = self._detect_haar
+            # Process-wide switch, so only flipped when Haar is the detector actually in use
+            cv2.ocl.setUseOpenCL(self.use_opencl)
+            if self.use_opencl:
+                print("✓ OpenCL enabled for Haar face detection")
+        else:
+            self._detect_fn = self._detect_dlib
+        
         self.drowsy_frame_count = 0
         self.yawn_frame_count = 0
         self.last_alert_time = 0
         
+        # Landmark indices of both eyes, left then right
+        self.ear_threshold = getattr(config, 'EAR_THRESHOLD', 0.25)
+        self.consecutive_frames_threshold = getattr(config, 'CONSECUTIVE_FRAMES_THRESHOLD', 20)
+        self.eye_idx = (list(range(getattr(config, 'LEFT_EYE_START', 36), getattr(config, 'LEFT_EYE_END', 41) + 1)) +
+                        list(range(getattr(config, 'RIGHT_EYE_START', 42), getattr(config, 'RIGHT_EYE_END', 47) + 1)))
+        
+        # Face detection runs on a downscaled frame
+        self.scale = getattr(config, 'DETECT_SCALE', 0.5)
+        
+        # Reused resize/grayscale destinations, reallocated only when the frame size changes
+        self._small_buf = None
+        self._gray_buf = None
+        
+        # Full detection every _detect_stride frames; faces are reused in between
+        self._frame_idx = 0
+        self._last_faces = []
+        self._detect_stride = getattr(config, 'DETECT_STRIDE', 5)
+        
+        # dlib HOG pyramid: no upsampling by default, optional score offset
+        self.dlib_upsample = getattr(config, 'DLIB_UPSAMPLE', 0)
+        self.dlib_adjust_threshold = getattr(config, 'DLIB_ADJUST_THRESHOLD', 0.0)
+        
         try:
             import pygame
             pygame.mixer.init()
@@ -41,9 +93,76 @@ class DrowsinessDetector:
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
     
-    def detect_drowsiness(self, frame):
-        """Main drowsiness detection function"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    def load_yunet(self):
+        """Load OpenCV's YuNet face detector, or return None to fall back to dlib/Haar"""
+        model_path = getattr(self.config, 'FACE_YUNET_MODEL', 'models/face_detection_yunet_2023mar.onnx')
+        if not hasattr(cv2, 'FaceDetectorYN') or not os.path.exists(model_path):
+            return None
+        
+        # FP16 on CUDA when OpenCV was built with it, otherwise the default CPU path
+        backend, target = cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU
+        if hasattr(cv2, 'cuda') and cv2.cuda.getCudaEnabledDeviceCount() > 0:
+            backend, target = cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA_FP16
+        
+        try:
+            # Input size is set per frame size in detect_drowsiness
+            yunet = cv2.FaceDetectorYN.create(
+                model_path, '', (320, 240),
+                getattr(self.config, 'FACE_YUNET_SCORE', 0.9),
+                getattr(self.config, 'FACE_YUNET_NMS', 0.3),
+                5000, backend, target)
+            print(f"✓ YuNet face detector loaded ({'CUDA FP16' if backend == cv2.dnn.DNN_BACKEND_CUDA else 'CPU'})")
+            return yunet
+        except cv2.error as e:
+            print(f"Warning: Could not load YuNet face detector: {e}")
+            return None
+    
+    def _detect_yunet(self, gray, small):
+        """YuNet detection on the downscaled BGR frame"""
+        _, faces = self._yunet.detect(small)
+        if faces is None:
+            return []
+        return [(max(int(x), 0), max(int(y), 0), int(w), int(h)) for x, y, w, h in faces[:, :4]]
+    
+    def _detect_haar(self, gray, small):
+        """Haar cascade detection, on OpenCL when enabled"""
+        src = cv2.UMat(gray) if self.use_opencl else gray
+        faces = self.detector.detectMultiScale(src, self.haar_scale_factor, self.haar_min_neighbors)
+        return [tuple(face) for face in faces]
+    
+    def _detect_dlib(self, gray, small):
+        """dlib HOG detection, with an optional score offset"""
+        if self.dlib_adjust_threshold:
+            faces = self.detector.run(gray, self.dlib_upsample, self.dlib_adjust_threshold)[0]
+        else:
+            faces = self.detector(gray, self.dlib_upsample)
+        return [(face.left(), face.top(), face.width(), face.height()) for face in faces]
+    
+    def detect_drowsiness(self, frame, gray=None, draw=True):
+        """Main drowsiness detection function
+        
+        gray may be passed in when the camera already delivers a luma plane,
+        which skips the BGR to grayscale conversion. With draw=False the frame
+        is left untouched.
+        """
+        # Downscale before the grayscale conversion; boxes are scaled back for drawing
+        src = gray if gray is not None else frame
+        width = max(int(round(src.shape[1] * self.scale)), 1)
+        height = max(int(round(src.shape[0] * self.scale)), 1)
+        if self._gray_buf is None or self._gray_buf.shape != (height, width):
+            self._gray_buf = np.empty((height, width), dtype=np.uint8)
+            self._small_buf = np.empty((height, width, 3), dtype=np.uint8)
+            if self._yunet is not None:
+                self._yunet.setInputSize((width, height))
+        small = None
+        if gray is None or self._yunet is not None:
+            # YuNet needs the colour frame even when a luma plane was passed in
+            small = cv2.resize(frame, (width, height), dst=self._small_buf, interpolation=cv2.INTER_AREA)
+        if gray is not None:
+            gray = cv2.resize(gray, (width, height), dst=self._gray_buf, interpolation=cv2.INTER_AREA)
+        else:
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._gray_buf)
+        inv_scale = 1.0 / self.scale
         
         drowsiness_status = {
             'drowsy': False,
@@ -54,38 +173,63 @@ class DrowsinessDetector:
         }
         
         try:
-            # Detect faces
-            if hasattr(self.detector, 'detectMultiScale'):  # OpenCV detector
-                faces = self.detector.detectMultiScale(gray, 1.1, 4)
-                drowsiness_status['face_detected'] = len(faces) > 0
-                
-                for (x, y, w, h) in faces:
+            # Detect faces, reusing the last result between strides
+            if self._frame_idx % self._detect_stride == 0:
+                self._last_faces = self._detect_fn(gray, small)
+            self._frame_idx += 1
+            faces = self._last_faces
+            
+            drowsiness_status['face_detected'] = len(faces) > 0
+            
+            for fx, fy, fw, fh in faces:
+                if draw:
+                    x, y, w, h = (int(v * inv_scale) for v in (fx, fy, fw, fh))
                     cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
                     cv2.putText(frame, "Face Detected", (x, y-10), 
                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
-                    break
-            else:  # Dlib detector
-                faces = self.detector(gray)
-                drowsiness_status['face_detected'] = len(faces) > 0
                 
-                for face in faces:
-                    x, y, w, h = face.left(), face.top(), face.width(), face.height()
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
-                    cv2.putText(frame, "Face Detected", (x, y-10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
-                    break
+                if self.predictor is not None:
+                    face = self._face_rect(int(fx), int(fy), int(fx + fw - 1), int(fy + fh - 1))
+                    self.check_eyes(gray, face, drowsiness_status)
+                break
             
             # Display face detection status
-            face_status = "FACE DETECTED" if drowsiness_status['face_detected'] else "NO FACE"
-            color = (0, 255, 0) if drowsiness_status['face_detected'] else (0, 0, 255)
-            cv2.putText(frame, face_status, (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+            if draw:
+                face_status = "FACE DETECTED" if drowsiness_status['face_detected'] else "NO FACE"
+                color = (0, 255, 0) if drowsiness_status['face_detected'] else (0, 0, 255)
+                cv2.putText(frame, face_status, (10, 30), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
         
         except Exception as e:
             self.logger.error(f"Error in drowsiness detection: {e}")
         
         return drowsiness_status, frame
     
+    def check_eyes(self, gray, face, drowsiness_status):
+        """Update drowsiness_status from the eye aspect ratio of one face"""
+        shape = self.predictor(gray, face)
+        pts = np.asarray([(shape.part(i).x, shape.part(i).y) for i in self.eye_idx],
+                         dtype=np.float32).reshape(2, 6, 2)
+        ear = mean_eye_aspect_ratio(pts)
+        drowsiness_status['ear'] = ear
+        
+        # Eyes must stay closed for several consecutive frames to count as drowsy
+        if ear < self.ear_threshold:
+            self.drowsy_frame_count += 1
+        else:
+            self.drowsy_frame_count = 0
+        
+        if self.drowsy_frame_count >= self.consecutive_frames_threshold:
+            drowsiness_status['drowsy'] = True
+            drowsiness_status['confidence'] = min(1.0, self.drowsy_frame_count / (2 * self.consecutive_frames_threshold))
+            
+            # Rate-limit alerts to one every few seconds
+            now = time.time()
+            if now - self.last_alert_time > 3.0:
+                self.last_alert_time = now
+                drowsiness_status['alert_triggered'] = True
+                self.trigger_alert(drowsiness_status)
+    
     def trigger_alert(self, status):
         """Trigger audio and visual alerts"""
         try:
@@ -0,0 +1,25 @@
+# Eye aspect ratio
+import math
+
+try:
+    from numba import njit
+except ImportError:
+    # Plain Python fallback when numba is not installed
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+@njit(cache=True)
+def eye_aspect_ratio(p):
+    """EAR of one eye from its 6 landmark rows (float32 array of shape (6, 2))"""
+    a = math.hypot(p[1, 0] - p[5, 0], p[1, 1] - p[5, 1])
+    b = math.hypot(p[2, 0] - p[4, 0], p[2, 1] - p[4, 1])
+    c = math.hypot(p[0, 0] - p[3, 0], p[0, 1] - p[3, 1])
+    if c == 0:
+        return 0.0
+    return (a + b) / (2.0 * c)
+
+def mean_eye_aspect_ratio(pts):
+    """Mean EAR of both eyes from a (2, 6, 2) float32 array of eye landmarks"""
+    return (eye_aspect_ratio(pts[0]) + eye_aspect_ratio(pts[1])) / 2.0
@@ -1,27 +1,61 @@
 import cv2
 import numpy as np
-from collections import defaultdict, deque
+from collections import defaultdict
 from typing import Dict, List, Tuple
 
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
 class PlateTracker:
-    def __init__(self, max_disappeared=30, max_distance=100):
+    TRACK_HISTORY_LEN = 10
+    TRACK_MIN_MOVE = 2  # Manhattan distance (px) a centroid must move to be recorded again
+    
+    def __init__(self, max_disappeared=30, max_distance=100, capacity=16):
         self.next_object_id = 0
         self.objects = {}
         self.disappeared = {}
         self.max_disappeared = max_disappeared
         self.max_distance = max_distance
         
+        # Centroids of live objects as parallel arrays; _slot maps object id -> index
+        self._cx = np.empty(capacity, dtype=np.int32)
+        self._cy = np.empty(capacity, dtype=np.int32)
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._n = 0
+        self._slot = {}
+        
     def register(self, centroid, plate_text=""):
+        if self._n == len(self._ids):
+            # Grow by doubling
+            self._cx = np.resize(self._cx, 2 * self._n)
+            self._cy = np.resize(self._cy, 2 * self._n)
+            self._ids = np.resize(self._ids, 2 * self._n)
+        self._cx[self._n], self._cy[self._n] = centroid
+        self._ids[self._n] = self.next_object_id
+        self._slot[self.next_object_id] = self._n
+        self._n += 1
+        
         self.objects[self.next_object_id] = {
             'centroid': centroid,
             'plate_text': plate_text,
-            'track_history': deque(maxlen=10),
-            'confidence_history': deque(maxlen=5)
+            # Ring buffer of recorded centroids; track_count is the total ever recorded
+            'track_history': np.zeros((self.TRACK_HISTORY_LEN, 2), dtype=np.int16),
+            'track_count': 0
         }
         self.disappeared[self.next_object_id] = 0
         self.next_object_id += 1
         
     def deregister(self, object_id):
+        # Swap the last slot into the freed one
+        i = self._slot.pop(object_id)
+        last = self._n - 1
+        if i != last:
+            self._cx[i], self._cy[i], self._ids[i] = self._cx[last], self._cy[last], self._ids[last]
+            self._slot[int(self._ids[i])] = i
+        self._n = last
+        
         del self.objects[object_id]
         del self.disappeared[object_id]
         
@@ -32,7 +66,7 @@ class PlateTracker:
                 if self.disappeared[object_id] > self.max_disappeared:
                     self.deregister(object_id)
             return self.get_tracked_objects()
-            
+        
         input_centroids = []
         plate_texts = []
         
@@ -42,43 +76,80 @@ class PlateTracker:
             cy = int(y + h / 2.0)
             input_centroids.append((cx, cy))
             plate_texts.append(detection.get('text', ''))
-            
-        if len(self.objects) == 0:
+        
+        if self._n == 0:
             for i, centroid in enumerate(input_centroids):
                 self.register(centroid, plate_texts[i])
         else:
-            object_centroids = [obj['centroid'] for obj in self.objects.values()]
-            object_ids = list(self.objects.keys())
-            
-            # Compute distance matrix
-            D = np.linalg.norm(np.array(object_centroids)[:, np.newaxis] - 
-                             np.array(input_centroids), axis=2)
+            n = self._n
+            inputs = np.array(input_centroids, dtype=np.int64)
+            max_d2 = self.max_distance ** 2
             
-            # Assign object centroids to input centroids
-            rows = D.min(axis=1).argsort()
-            cols = D.argmin(axis=1)[rows]
+            # Squared distance matrix (no sqrt needed to compare against max_distance)
+            dx = np.subtract.outer(self._cx[:n].astype(np.int64), inputs[:, 0])
+            dy = np.subtract.outer(self._cy[:n].astype(np.int64), inputs[:, 1])
+            D2 = dx * dx + dy * dy
             
-            used_row_indices = set()
-            used_col_indices = set()
+            # Assign object centroids to input centroids, dropping pairs further apart than max_distance
+            if linear_sum_assignment is not None:
+                rows, cols = linear_sum_assignment(D2)
+            else:
+                rows, cols = self.greedy_assignment(D2)
+            rows, cols = np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)
+            keep = D2[rows, cols] <= max_d2
+            rows, cols = rows[keep], cols[keep]
             
             for (row, col) in zip(rows, cols):
-                if row in used_row_indices or col in used_col_indices:
-                    continue
-                    
-                if D[row, col] > self.max_distance:
-                    continue
-                    
-                object_id = object_ids[row]
-                self.objects[object_id]['centroid'] = input_centroids[col]
-                self.objects[object_id]['track_history'].append(input_centroids[col])
-                if plate_texts[col]:
-                    self.objects[object_id]['plate_text'] = plate_texts[col]
+                object_id = int(self._ids[row])
+                self._cx[row], self._cy[row] = input_centroids[col]
+                obj = self.objects[object_id]
+                obj['centroid'] = input_centroids[col]
+                self.record_track(obj, input_centroids[col])
+                if plate_texts[col] and plate_texts[col] != obj['plate_text']:
+                    obj['plate_text'] = plate_texts[col]
                 self.disappeared[object_id] = 0
-                
-                used_row_indices.add(row)
-                used_col_indices.add(col)
-                
+        
         return self.get_tracked_objects()
         
+    def record_track(self, obj, centroid):
+        """Append a centroid to the object's ring buffer unless it barely moved"""
+        history = obj['track_history']
+        count = obj['track_count']
+        cx, cy = centroid
+        if count:
+            last = history[(count - 1) % self.TRACK_HISTORY_LEN]
+            if abs(int(last[0]) - cx) + abs(int(last[1]) - cy) <= self.TRACK_MIN_MOVE:
+                return
+        history[count % self.TRACK_HISTORY_LEN] = (cx, cy)
+        obj['track_count'] = count + 1
+    
+    def get_track_history(self, object_id):
+        """Recorded centroids of an object, oldest first"""
+        obj = self.objects[object_id]
+        count = obj['track_count']
+        if count <= self.TRACK_HISTORY_LEN:
+            return obj['track_history'][:count].copy()
+        return np.roll(obj['track_history'], -(count % self.TRACK_HISTORY_LEN), axis=0)
+    
+    @staticmethod
+    def greedy_assignment(D):
+        """Closest-first matching, used when scipy is not installed"""
+        rows = D.min(axis=1).argsort()
+        cols = D.argmin(axis=1)[rows]
+        
+        used_row_indices = set()
+        used_col_indices = set()
+        matched_rows, matched_cols = [], []
+        
+        for (row, col) in zip(rows, cols):
+            if row in used_row_indices or col in used_col_indices:
+                continue
+            used_row_indices.add(row)
+            used_col_indices.add(col)
+            matched_rows.append(row)
+            matched_cols.append(col)
+        
+        return matched_rows, matched_cols
+        
     def get_tracked_objects(self):
         return {obj_id: obj for obj_id, obj in self.objects.items()}
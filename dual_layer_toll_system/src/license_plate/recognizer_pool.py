@@ -0,0 +1,82 @@
+# Shared plate recognizer pool for multi-camera setups
+import itertools
+import multiprocessing as mp
+import os
+import queue
+
+def _worker(device, jobs, results):
+    """Own one recognizer on one GPU and serve frames until a None job arrives"""
+    # Must be set before EasyOCR/torch is imported in this process
+    if device is not None:
+        os.environ['CUDA_VISIBLE_DEVICES'] = str(device)
+    
+    from config.config import Config
+    from src.license_plate.plate_recognizer import LicensePlateRecognizer
+    recognizer = LicensePlateRecognizer(Config())
+    
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, camera_id, frame = job
+        plates, _ = recognizer.detect_and_recognize(frame, draw=False)
+        # Contours are only needed for drawing; keep the result small to pickle
+        for plate in plates:
+            plate.pop('contour', None)
+        results.put((job_id, camera_id, plates))
+
+class RecognizerPool:
+    """Fixed pool of plate recognizer processes shared by several cameras
+    
+    One EasyOCR reader is loaded per worker instead of one per camera.
+    Workers are spread round-robin over the given GPU ids.
+    """
+    def __init__(self, devices=(0,), workers_per_device=1, max_pending=32):
+        ctx = mp.get_context('spawn')
+        self.jobs = ctx.Queue(maxsize=max_pending)
+        self.results = ctx.Queue()
+        self._ids = itertools.count()
+        self.workers = [
+            ctx.Process(target=_worker, args=(device, self.jobs, self.results), daemon=True)
+            for device in list(devices) * workers_per_device
+        ]
+    
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        return self
+    
+    def submit(self, camera_id, frame, block=True):
+        """Queue a frame; returns its job id, or None if the queue is full and block is False"""
+        job_id = next(self._ids)
+        try:
+            self.jobs.put((job_id, camera_id, frame), block=block)
+        except queue.Full:
+            return None
+        return job_id
+    
+    def get(self, timeout=None):
+        """Next finished (job_id, camera_id, plates), or None on timeout"""
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def close(self, timeout=5.0):
+        """Ask workers to exit, terminating any that cannot be reached or do not stop in time"""
+        for _ in self.workers:
+            try:
+                self.jobs.put(None, timeout=timeout)
+            except queue.Full:
+                # Job queue is still full; the join below terminates whoever is left
+                break
+        for worker in self.workers:
+            worker.join(timeout=timeout)
+            if worker.is_alive():
+                worker.terminate()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,61 @@
+# Camera utils
+import threading
+
+class FrameGrabber(threading.Thread):
+    """Background thread that keeps only the newest camera frame
+    
+    Cameras can take several seconds to deliver their first frame (e.g. V4L2
+    format negotiation), so read() waits up to startup_timeout (None: forever)
+    until one has arrived and only then applies its own timeout.
+    """
+    def __init__(self, cap, startup_timeout=10.0):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.startup_timeout = startup_timeout
+        self.latest = None
+        self.ok = True
+        self.lock = threading.Condition()
+        self._frame_id = 0
+        self._read_id = 0
+        self._running = False
+    
+    def start(self):
+        self._running = True
+        super().start()
+        return self
+    
+    def run(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            with self.lock:
+                self.ok = ret
+                if ret:
+                    # Overwrite instead of queueing so stale frames are dropped
+                    self.latest = frame
+                    self._frame_id += 1
+                self.lock.notify_all()
+            if not ret:
+                break
+    
+    def read(self, timeout=1.0):
+        """Return (ret, frame) like cap.read(), waiting for a frame newer than the last one returned"""
+        with self.lock:
+            if self._frame_id == 0:
+                timeout = self.startup_timeout
+            self.lock.wait_for(lambda: self._frame_id != self._read_id or not self.ok, timeout)
+            if self.latest is None or self._frame_id == self._read_id:
+                return False, None
+            self._read_id = self._frame_id
+            return True, self.latest.copy()
+    
+    def drain(self):
+        """Discard the buffered frame so the next read() returns a fresh one"""
+        with self.lock:
+            self.latest = None
+            self._read_id = self._frame_id
+    
+    def stop(self):
+        """Stop grabbing; returns once the thread has left cap.read(), so the caller may release cap"""
+        self._running = False
+        if self.is_alive():
+            self.join()
@@ -4,23 +4,30 @@ import numpy as np
 import os
 from pathlib import Path
 
+from utils.image_utils import read_image
+
+ALERT_SOUND_PATH = Path("data/alert_sound.wav")
+
 def load_sample_images():
-    """Load sample images for testing"""
+    """Load sample images for testing, fitted to 800x600"""
     sample_dir = Path("data/sample_images")
-    image_files = list(sample_dir.glob("*.jpg")) + list(sample_dir.glob("*.png"))
+    # Single directory scan, filtering by extension
+    image_files = [p for p in sample_dir.iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png')]
     
     images = []
     for img_file in image_files:
-        img = cv2.imread(str(img_file))
+        img = read_image(img_file)
         if img is not None:
             images.append((str(img_file), img))
     
     return images
 
-def create_alert_sound():
-    """Create a simple alert sound file"""
+def create_alert_sound(force=False):
+    """Create a simple alert sound file, unless it already exists"""
+    if ALERT_SOUND_PATH.exists() and not force:
+        return
+    
     try:
-        import numpy as np
         from scipy.io.wavfile import write
         
         # Generate a simple beep sound
@@ -28,13 +35,13 @@ def create_alert_sound():
         duration = 1.0  # seconds
         frequency = 800  # Hz
         
-        t = np.linspace(0, duration, int(sample_rate * duration))
-        audio_data = np.sin(2 * np.pi * frequency * t) * 0.5
-        
-        # Convert to 16-bit integers
-        audio_data = (audio_data * 32767).astype(np.int16)
+        # Build the phase in float32 and convert straight to 16-bit integers
+        n = int(sample_rate * duration)
+        phase = (2 * np.pi * frequency / sample_rate) * np.arange(n, dtype=np.float32)
+        audio_data = (np.sin(phase, dtype=np.float32) * (0.5 * 32767)).astype(np.int16)
         
-        write("data/alert_sound.wav", sample_rate, audio_data)
+        ALERT_SOUND_PATH.parent.mkdir(parents=True, exist_ok=True)
+        write(str(ALERT_SOUND_PATH), sample_rate, audio_data)
         print("Alert sound created successfully!")
         
     except ImportError:
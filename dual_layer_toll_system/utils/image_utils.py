@@ -3,6 +3,16 @@ import cv2
 import numpy as np
 from pathlib import Path
 
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Decoder-side downscaling flags, largest factor first
+_REDUCED_READ_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                       (4, cv2.IMREAD_REDUCED_COLOR_4),
+                       (2, cv2.IMREAD_REDUCED_COLOR_2))
+
 def resize_image(image, max_width=800, max_height=600):
     """Resize image while maintaining aspect ratio"""
     height, width = image.shape[:2]
@@ -14,3 +24,28 @@ def resize_image(image, max_width=800, max_height=600):
         return cv2.resize(image, (new_width, new_height))
     
     return image
+
+def read_image(path, max_width=800, max_height=600):
+    """Load an image already fitted to max_width x max_height
+    
+    When the file is at least twice the target size, the decoder downscales
+    while decoding (IMREAD_REDUCED_COLOR_*), which for JPEG skips most of
+    the IDCT work. Only the header is read to decide.
+    """
+    flags = cv2.IMREAD_COLOR
+    if Image is not None:
+        try:
+            with Image.open(path) as header:
+                width, height = header.size
+            for factor, reduced_flag in _REDUCED_READ_FLAGS:
+                # Never reduce below the target size
+                if width // factor >= max_width and height // factor >= max_height:
+                    flags = reduced_flag
+                    break
+        except OSError:
+            pass
+    
+    image = cv2.imread(str(path), flags)
+    if image is None:
+        return None
+    return resize_image(image, max_width, max_height)